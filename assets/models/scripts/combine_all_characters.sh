@@ -0,0 +1,13 @@
+#!/bin/bash
+# Batch-process all WAG GAME characters in a single Blender session.
+#
+# Usage:
+#   ./combine_all_characters.sh                           # all characters
+#   ./combine_all_characters.sh casual_male_g             # specific characters (comma-separated)
+#   ./combine_all_characters.sh all --parallel            # one worker process per character
+
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+CHARACTERS="${1:-all}"
+shift 2>/dev/null || true
+
+blender --background --python-exit-code 1 --python "$SCRIPT_DIR/combine_mixamo_animations.py" -- --characters "$CHARACTERS" "$@"